@@ -6,6 +6,7 @@ Connects to OpenRouter/DeepSeek to power multiple agent types
 import os
 import json
 import httpx
+import orjson
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 
@@ -104,7 +105,7 @@ Generate a fix. Respond ONLY with valid JSON in this exact format:
             )
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             content = result["choices"][0]["message"]["content"]
             
             # Parse the JSON response
@@ -114,7 +115,7 @@ Generate a fix. Respond ONLY with valid JSON in this exact format:
             elif "```" in content:
                 content = content.split("```")[1].split("```")[0]
             
-            fix_data = json.loads(content.strip())
+            fix_data = orjson.loads(content.strip())
             
             # Validate required fields
             required_fields = ["fix_type", "code", "explanation", "risk_level"]
@@ -171,7 +172,7 @@ Respond with JSON only:
             )
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             content = result["choices"][0]["message"]["content"]
             
             if "```" in content:
@@ -179,7 +180,7 @@ Respond with JSON only:
                 if content.startswith("json"):
                     content = content[4:]
             
-            return json.loads(content.strip())
+            return orjson.loads(content.strip())
     
     async def process_request(
         self,
@@ -238,7 +239,7 @@ Respond with JSON matching this exact format:
             )
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             content = result["choices"][0]["message"]["content"]
             
             # Parse JSON from response
@@ -247,7 +248,7 @@ Respond with JSON matching this exact format:
             elif "```" in content:
                 content = content.split("```")[1].split("```")[0]
             
-            response_data = json.loads(content.strip())
+            response_data = orjson.loads(content.strip())
             
             # Add metadata
             response_data["_agent_type"] = config.agent_type.value
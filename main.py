@@ -7,14 +7,17 @@ import os
 import uuid
 import time
 import asyncio
+import httpx
+import orjson
 from typing import Optional
 from datetime import datetime
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI, HTTPException, Header, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, Header, BackgroundTasks, Request, Depends
 from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,6 +27,7 @@ load_dotenv()
 from core.brain import get_brain, AIBrain
 from core.safety import get_safety, get_content_safety, SafetyLayer, RiskLevel
 from core.agents import AgentType, get_agent_config, list_available_agents
+from core.database import get_db, init_db
 from tools.scout import get_vault, ClientVault
 from tools.database_fixer import get_fixer, DatabaseFixer
 from tools.billing import get_billing, BillingSystem
@@ -126,11 +130,11 @@ async def lifespan(app: FastAPI):
     print("🚀 AI Money Printer starting up...")
     print(f"📡 Listening on {os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}")
     
+    # Ensure DB tables exist before the first request (the vault no longer checks per call)
+    await init_db()
+    
     # Initialize singletons
-    # Initialize singletons
-    vault = get_vault()
-    # Ensure DB tables exist on startup
-    await vault._ensure_db_ready()
+    get_vault()
     
     get_billing()
     get_fixer()
@@ -186,12 +190,20 @@ async def lifespan(app: FastAPI):
             await asyncio.sleep(900)
 
     # Spawn the loop as a background task
-    asyncio.create_task(run_hunter_loop())
+    hunter_task = asyncio.create_task(run_hunter_loop())
 
     yield
     
     # Shutdown
     print("👋 AI Money Printer shutting down...")
+    hunter_task.cancel()
+    # Let the cycle's cleanup (Telegram flush) finish before its HTTP client is closed
+    with suppress(asyncio.CancelledError):
+        await hunter_task
+    # Release the hunter's pooled HTTP connections
+    await get_hunter().close()
+    # Write any buffered client last_activity stamps
+    await get_vault().close()
 
 
 # =============================================================================
@@ -299,7 +311,7 @@ async def process_fix(
         )
         
         # Update client stats
-        vault.update_client_stats(client_id, billing_record.amount_usd)
+        await vault.update_client_stats(client_id, billing_record.amount_usd)
         
         print(f"✅ [{fix_id}] Complete! Earned ${billing_record.amount_usd:.2f}")
     
@@ -355,7 +367,8 @@ async def favicon():
 async def receive_error(
     error_report: ErrorReport,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(..., description="Client API key")
+    x_api_key: str = Header(..., description="Client API key"),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Main webhook endpoint - receives errors from client systems.
@@ -364,7 +377,7 @@ async def receive_error(
     """
     # Step 1: Verify the client
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -376,7 +389,7 @@ async def receive_error(
     fix_id = f"fix_{uuid.uuid4().hex[:12]}"
     
     # Step 3: Get client's database connection
-    connection_string = vault.get_decrypted_connection(client)
+    connection_string = await vault.get_decrypted_connection(client)
     db_type = error_report.database_type or client.database_type
     
     # Step 4: Queue the fix for background processing
@@ -442,7 +455,8 @@ async def register_client(
     database_type: str,
     connection_string: str,
     plan: str = "per-fix",
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """Register a new client (admin only)."""
     if x_api_key != os.getenv("WEBHOOK_SECRET"):
@@ -453,7 +467,8 @@ async def register_client(
         company_name=company_name,
         database_type=database_type,
         connection_string=connection_string,
-        plan=plan
+        plan=plan,
+        session=session
     )
     
     return {
@@ -464,13 +479,12 @@ async def register_client(
 
 
 @app.get("/clients")
-async def list_clients(x_api_key: str = Header(...)):
+async def list_clients(x_api_key: str = Header(...), session: AsyncSession = Depends(get_db)):
     """List all active clients (admin only)."""
     if x_api_key != os.getenv("WEBHOOK_SECRET"):
         raise HTTPException(status_code=401, detail="Admin access required")
     
     vault = get_vault()
-    clients = await vault.list_active_clients_async()
     
     return [
         {
@@ -482,18 +496,20 @@ async def list_clients(x_api_key: str = Header(...)):
             "total_billed": c.total_billed,
             "last_activity": c.last_activity
         }
-        for c in clients
+        async for c in vault.iter_active_clients(session)
     ]
 
 @app.post("/buy-access")
-async def buy_access(request: BuyAccessRequest):
+async def buy_access(
+    request: BuyAccessRequest,
+    billing: BillingSystem = Depends(get_billing),
+    vault: ClientVault = Depends(get_vault),
+    session: AsyncSession = Depends(get_db)
+):
     """
     Self-service checkout endpoint.
     Generates a crypto invoice for the API access fee ($50 deposit).
     """
-    billing = get_billing()
-    vault = get_vault()
-    
     # 1. Generate Invoice (using a $50 deposit as "access fee" or credit)
     # In a real app, you might have a dedicated setup fee. 
     # Here we treat it as a deposit for future fixes.
@@ -520,7 +536,8 @@ async def buy_access(request: BuyAccessRequest):
         company_name=request.company_name,
         database_type="postgres", # Default, can be changed
         connection_string="pending_payment", 
-        plan=request.plan
+        plan=request.plan,
+        session=session
     )
     
     # Store the mapping of order_id -> client_id so webhook can activate
@@ -657,7 +674,7 @@ async def process_multi_agent_request(
             print(f"💸 [{request_id}] Invoice Created: {payment_link}")
         
         # Update client stats
-        vault.update_client_stats(client_id, billing_record.amount_usd)
+        await vault.update_client_stats(client_id, billing_record.amount_usd)
         
         print(f"✅ [{request_id}] Complete! Earned ${billing_record.amount_usd:.2f}")
         
@@ -672,14 +689,15 @@ async def process_multi_agent_request(
 async def handle_support_ticket(
     ticket: SupportTicket,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Customer Support Agent endpoint.
     Resolves customer issues automatically. Bills $0.99 per resolved ticket.
     """
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -708,14 +726,15 @@ async def handle_support_ticket(
 async def handle_sales_lead(
     lead: SalesLead,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Sales Agent endpoint.
     Qualifies leads and books meetings. Bills $2.50 per booked meeting.
     """
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -743,14 +762,15 @@ async def handle_sales_lead(
 async def handle_email(
     email: EmailRequest,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Email Auto-Responder endpoint.
     Drafts professional email responses. Bills $0.50 per drafted email.
     """
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -778,14 +798,15 @@ async def handle_email(
 async def handle_appointment(
     appointment: AppointmentRequest,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Appointment Setter endpoint.
     Books and confirms appointments. Bills $1.50 per confirmed appointment.
     """
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -813,14 +834,15 @@ async def handle_appointment(
 async def handle_universal_request(
     request: UniversalRequest,
     background_tasks: BackgroundTasks,
-    x_api_key: str = Header(...)
+    x_api_key: str = Header(...),
+    session: AsyncSession = Depends(get_db)
 ):
     """
     Universal endpoint that works with ANY agent type.
     Pass agent_type and data in the request body.
     """
     vault = get_vault()
-    client = await vault.verify_client_async(x_api_key)
+    client = await vault.verify_client_async(x_api_key, session)
     
     if not client:
         raise HTTPException(status_code=401, detail="Invalid API key")
@@ -860,13 +882,13 @@ async def handle_universal_request(
 # =============================================================================
 
 @app.post("/webhook/nowpayments")
-async def nowpayments_ipn(request: Request):
+async def nowpayments_ipn(request: Request, billing: BillingSystem = Depends(get_billing)):
     """
     Real-time listener for crypto payments.
     NOWPayments pings this endpoint when a payment status changes.
     Configure this URL in your NOWPayments dashboard under IPN settings.
     """
-    payload = await request.json()
+    payload = orjson.loads(await request.body())
     
     payment_status = payload.get("payment_status")
     order_id = payload.get("order_id")
@@ -880,7 +902,6 @@ async def nowpayments_ipn(request: Request):
         print(f"💰💰💰 REAL MONEY RECEIVED! Order {order_id} is fully paid.")
         
         # Send Telegram notification for confirmed payment
-        billing = get_billing()
         if billing.telegram_token and billing.telegram_chat_id:
             message = f"""🎉 **PAYMENT CONFIRMED!**
 
@@ -891,7 +912,6 @@ async def nowpayments_ipn(request: Request):
 The money is now in your wallet! 🚀
 """
             try:
-                import httpx
                 url = f"https://api.telegram.org/bot{billing.telegram_token}/sendMessage"
                 async with httpx.AsyncClient() as client:
                     await client.post(url, json={
@@ -905,7 +925,6 @@ The money is now in your wallet! 🚀
     elif payment_status == "partially_paid":
         print(f"⚠️ Partial payment received for Order {order_id}")
         
-        billing = get_billing()
         if billing.telegram_token and billing.telegram_chat_id:
             message = f"""⚠️ **PARTIAL PAYMENT RECEIVED**
 
@@ -916,7 +935,6 @@ The money is now in your wallet! 🚀
 Action Required: Check NOWPayments dashboard.
 """
             try:
-                import httpx
                 url = f"https://api.telegram.org/bot{billing.telegram_token}/sendMessage"
                 async with httpx.AsyncClient() as client:
                     await client.post(url, json={
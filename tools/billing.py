@@ -5,6 +5,8 @@ Turns successful fixes into cash - only runs after safety.py green light
 
 import os
 import httpx
+import orjson
+from functools import lru_cache
 from typing import Optional, List
 from datetime import datetime
 from dataclasses import dataclass
@@ -44,6 +46,10 @@ class BillingSystem:
         self.fix_price = float(os.getenv("FIX_PRICE_USD", "5.00"))
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        
+        # Invoices at or above this amount are assumed to clear the network
+        # minimum, so the min-amount lookup is skipped for them
+        self._hard_floor = float(os.getenv("NOWPAY_HARD_FLOOR_USD", "2.0"))
     
     async def log_success(
         self,
@@ -113,7 +119,7 @@ class BillingSystem:
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.get(url, headers=headers)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     return float(data.get("min_amount", 0))
                 return 0.0
         except Exception as e:
@@ -135,13 +141,14 @@ class BillingSystem:
         if not api_key:
             return None
             
-        # 1. Check Minimum Amount Logic
-        min_amount = await self.get_min_payment_amount("usd", pay_currency)
-        safe_min = min_amount * 1.10
-        
-        if amount < safe_min:
-            print(f"⚠️ Billing Skipped: Amount ${amount:.2f} is below network minimum (${safe_min:.2f} for {pay_currency})")
-            return None
+        # 1. Check Minimum Amount Logic (only small invoices need the round-trip)
+        if amount < self._hard_floor:
+            min_amount = await self.get_min_payment_amount("usd", pay_currency)
+            safe_min = min_amount * 1.10
+            
+            if amount < safe_min:
+                print(f"⚠️ Billing Skipped: Amount ${amount:.2f} is below network minimum (${safe_min:.2f} for {pay_currency})")
+                return None
         
         url = "https://api.nowpayments.io/v1/invoice"
         headers = {
@@ -161,10 +168,10 @@ class BillingSystem:
         
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, headers=headers, json=payload)
+                response = await client.post(url, headers=headers, content=orjson.dumps(payload))
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     invoice_url = data.get("invoice_url")
                     print(f"💳 Invoice created: {invoice_url}")
                     return invoice_url
@@ -198,11 +205,15 @@ class BillingSystem:
         
         try:
             async with httpx.AsyncClient() as client:
-                await client.post(url, json={
-                    "chat_id": self.telegram_chat_id,
-                    "text": message,
-                    "parse_mode": "Markdown"
-                })
+                await client.post(
+                    url,
+                    headers={"Content-Type": "application/json"},
+                    content=orjson.dumps({
+                        "chat_id": self.telegram_chat_id,
+                        "text": message,
+                        "parse_mode": "Markdown"
+                    })
+                )
         except Exception as e:
             print(f"Warning: Telegram notification failed: {e}")
     
@@ -269,12 +280,7 @@ class BillingSystem:
 
 
 # Singleton instance
-_billing_instance: Optional[BillingSystem] = None
-
-
+@lru_cache(maxsize=1)
 def get_billing() -> BillingSystem:
     """Get or create the singleton billing instance."""
-    global _billing_instance
-    if _billing_instance is None:
-        _billing_instance = BillingSystem()
-    return _billing_instance
+    return BillingSystem()
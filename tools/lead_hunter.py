@@ -4,15 +4,23 @@ Finds potential customers on Reddit/Twitter and sends outreach emails
 """
 
 import os
-import json
+import re
+import csv
+import math
+import time
 import asyncio
 import hashlib
+import urllib.parse
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 from dataclasses import dataclass, asdict
 
 import httpx
-from sqlalchemy import select, update
+import orjson
+from sqlalchemy import select, insert, update, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
@@ -20,10 +28,36 @@ from dotenv import load_dotenv
 from core import database
 from core.database import LeadModel, init_db
 
+# Optional - single-pass keyword matching (pip install pyahocorasick)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 load_dotenv()
 
 
-@dataclass
+def _build_keyword_matcher(keywords: List[str]):
+    """Build an Aho-Corasick automaton over the lowercased keywords, if available."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in keywords:
+        automaton.add_word(kw.lower(), kw)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_keyword_regex(keywords: List[str]) -> re.Pattern:
+    """
+    Fallback matcher: one alternation regex over the lowercased keywords.
+    The lookahead lets overlapping hits ("mysql error" / "sql error") both match.
+    """
+    alternation = "|".join(re.escape(kw.lower()) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))")
+
+
+@dataclass(slots=True)
 class Lead:
     """Represents a potential customer lead."""
     lead_id: str
@@ -41,6 +75,64 @@ class Lead:
     created_at: str
 
 
+class _BloomFilter:
+    """
+    Fixed-size Bloom filter over string keys.
+    Can return false positives (never false negatives), so a hit still needs
+    an authoritative check but a miss is definitely a new key.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        # m = -n ln p / (ln 2)^2, k = m/n ln 2
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+    
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per `period` seconds."""
+    
+    def __init__(self, rate: float, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = rate
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate / self.period)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+    
+    def defer(self, seconds: float):
+        """Hold back all further acquisitions for at least `seconds`."""
+        self._tokens = 0
+        self._last = max(self._last, time.monotonic() + seconds)
+
+
+# LeadModel columns in Lead field order, for positional row -> Lead construction
+LEAD_COLUMNS = [getattr(LeadModel, name) for name in Lead.__dataclass_fields__]
+
+
 class LeadHunter:
     """
     Autonomous lead generation agent.
@@ -64,10 +156,53 @@ class LeadHunter:
         "stuck on this bug", "code help needed", "willing to pay for fix", 
         "urgent help needed coding", "developer needed asap"
     ]
+    HUNTING_KEYWORDS_LOWER = [k.lower() for k in HUNTING_KEYWORDS]
+    _KEYWORD_ORIGINAL_BY_LOWER = dict(zip(HUNTING_KEYWORDS_LOWER, HUNTING_KEYWORDS))
+    
+    # Matches every hunting keyword in one pass over a post (None without pyahocorasick)
+    _KEYWORD_MATCHER = _build_keyword_matcher(HUNTING_KEYWORDS)
+    _KEYWORD_RE = _build_keyword_regex(HUNTING_KEYWORDS)
     
     # Dynamic list that gets updated
     DYNAMIC_TRENDS = []
     
+    # Authors that are never real leads
+    IGNORED_AUTHORS = frozenset({"[deleted]", "AutoModerator", ""})
+    
+    # Max Reddit requests in flight at once during a hunt
+    MAX_CONCURRENT_REQUESTS = 16
+    
+    # Newest posts pulled from each subreddit per hunt (Reddit's max listing size)
+    POSTS_PER_SUBREDDIT = 100
+    
+    # Reddit request budget shared by every listing fetch (token bucket)
+    REDDIT_REQUESTS_PER_MINUTE = 30
+    
+    # Retries for 429/5xx Reddit responses (exponential backoff)
+    REDDIT_MAX_RETRIES = 3
+    
+    # Reuse identical Reddit listings fetched within this window (e.g. a manual
+    # /hunter/run right after the background cycle)
+    REDDIT_CACHE_TTL = 300
+    REDDIT_CACHE_SIZE = 512
+    
+    # Max OpenRouter calls in flight at once
+    MAX_CONCURRENT_AI_REQUESTS = 5
+    # Generated messages kept for reuse (LRU - the hunter runs for the life of the app)
+    MSG_CACHE_SIZE = 1024
+    
+    # Outreach workers per cycle; DMs are still sent at most once a minute
+    OUTREACH_WORKERS = 4
+    DMS_PER_MINUTE = 1
+    
+    # Batches larger than this are saved with COPY instead of INSERT
+    COPY_THRESHOLD = 100
+    
+    # Telegram alert batching: Telegram rejects messages over 4096 chars
+    TELEGRAM_MAX_CHARS = 4096
+    TELEGRAM_BATCH_SIZE = 10
+    TELEGRAM_BATCH_WAIT = 2.0
+    
     TARGET_SUBREDDITS = [
         "webdev", "programming", "learnprogramming", "SaaS", "startups",
         "Entrepreneur", "smallbusiness", "techsupport", "database", "sql",
@@ -91,148 +226,437 @@ class LeadHunter:
         # AI
         self.openrouter_key = os.getenv("OPENROUTER_API_KEY")
         
+        # Reddit app credentials (OAuth endpoints get a much larger rate limit)
+        self.reddit_client_id = os.getenv("REDDIT_CLIENT_ID")
+        self.reddit_client_secret = os.getenv("REDDIT_CLIENT_SECRET")
+        self._reddit_token: Optional[str] = None
+        self._reddit_token_expires = 0.0
+        
         # Rate limiting
         self.max_outreach_per_day = int(os.getenv("MAX_OUTREACH_PER_DAY", "20"))
         
+        # Lead IDs known to exist in the DB (confirmed by lookup or saved here)
+        self._known_ids: set[str] = set()
+        
+        # Every lead ID stored when seeded, plus the ones this process saved since.
+        # Leads other processes write later aren't in it; the save skips those
+        self._seen_bloom: Optional[_BloomFilter] = None
+        
+        # Generated outreach messages keyed by a hash of the post excerpt (LRU, MSG_CACHE_SIZE)
+        self._msg_cache: OrderedDict[str, str] = OrderedDict()
+        self._ai_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_AI_REQUESTS)
+        
+        # Paces Reddit requests across the whole process
+        self._reddit_limiter = _RateLimiter(self.REDDIT_REQUESTS_PER_MINUTE, 60.0)
+        self._dm_limiter = _RateLimiter(self.DMS_PER_MINUTE, 60.0)
+        
+        # (path, params) -> (expires_at, response) for recent Reddit listings
+        self._reddit_cache: Dict[tuple, tuple[float, httpx.Response]] = {}
+        
+        # Shared HTTP client (created lazily, closed on app shutdown)
+        self._http: Optional[httpx.AsyncClient] = None
+        
+        # Batched Telegram alerts (only active while a hunting cycle runs).
+        # Cycles can overlap (/hunter/run + the background loop), so they share
+        # one worker and the last one to finish stops it
+        self._tg_queue: Optional[asyncio.Queue] = None
+        self._tg_worker: Optional[asyncio.Task] = None
+        self._tg_users = 0
+        
     async def _ensure_db_ready(self):
         """Ensure tables exist."""
         await init_db()
     
+    async def _get_http(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=30,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+        return self._http
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
     def _generate_lead_id(self, platform: str, username: str, post_url: str) -> str:
         """Generate unique lead ID."""
         content = f"{platform}:{username}:{post_url}"
-        return hashlib.md5(content.encode()).hexdigest()[:12]
+        # MD5 is kept on purpose: stored IDs are MD5-based, and a different hash
+        # would let already-contacted posts slip past the duplicate check
+        return hashlib.md5(content.encode(), usedforsecurity=False).hexdigest()[:12]
+    
+    def _match_keywords(self, content_lower: str) -> List[str]:
+        """Return every hunting keyword (and current trend) found in the lowercased post content."""
+        if self._KEYWORD_MATCHER is not None:
+            matched = dict.fromkeys(kw for _, kw in self._KEYWORD_MATCHER.iter(content_lower))
+        else:
+            matched = {
+                self._KEYWORD_ORIGINAL_BY_LOWER[kw]: None
+                for kw in self._KEYWORD_RE.findall(content_lower)
+            }
+        # Only a handful of trends, and they change every cycle - plain substring checks
+        matched.update((trend, None) for trend in self.DYNAMIC_TRENDS if trend.lower() in content_lower)
+        return list(matched)
+    
+    async def _seed_bloom(self) -> _BloomFilter:
+        """Build the Bloom filter from the lead IDs stored right now (once per process)."""
+        if self._seen_bloom is None:
+            async with database.async_session_maker() as session:
+                result = await session.execute(select(LeadModel.lead_id))
+                lead_ids = result.scalars().all()
+            
+            bloom = _BloomFilter(capacity=max(10_000, 2 * len(lead_ids)))
+            for lead_id in lead_ids:
+                bloom.add(lead_id)
+            self._seen_bloom = bloom
+        return self._seen_bloom
+    
+    async def _find_existing_ids(self, lead_ids: List[str]) -> set[str]:
+        """
+        Return the subset of lead_ids already stored, using one IN query for
+        any IDs not already known to exist.
+        A pre-filter only: IDs written by another process after the Bloom filter
+        was seeded read as new, and _save_leads_async drops them on conflict.
+        """
+        bloom = await self._seed_bloom()
+        
+        existing = {lead_id for lead_id in lead_ids if lead_id in self._known_ids}
+        # Bloom misses weren't stored at seed time or by us - skip the DB for those
+        unknown = [lead_id for lead_id in lead_ids if lead_id not in existing and lead_id in bloom]
+        
+        if unknown:
+            async with database.async_session_maker() as session:
+                stmt = select(LeadModel.lead_id).where(LeadModel.lead_id.in_(unknown))
+                found = set((await session.execute(stmt)).scalars().all())
+            self._known_ids.update(found)
+            existing |= found
+        
+        return existing
     
     async def _is_duplicate_async(self, lead_id: str) -> bool:
         """Check if lead already exists."""
-        async with database.async_session_maker() as session:
-            stmt = select(LeadModel).where(LeadModel.lead_id == lead_id)
-            result = await session.execute(stmt)
-            return result.scalar_one_or_none() is not None
+        return bool(await self._find_existing_ids([lead_id]))
             
-    async def _save_lead_async(self, lead: Lead):
-        """Save a new lead to DB."""
-        new_lead = LeadModel(
-            lead_id=lead.lead_id,
-            platform=lead.platform,
-            username=lead.username,
-            email=lead.email,
-            post_content=lead.post_content,
-            post_url=lead.post_url,
-            keywords_matched=json.dumps(lead.keywords_matched),
-            status=lead.status,
-            first_contact_date=lead.first_contact_date,
-            last_contact_date=lead.last_contact_date,
-            follow_up_count=lead.follow_up_count,
-            notes=lead.notes,
-            created_at=lead.created_at
-        )
+    async def _save_lead_async(self, lead: Lead) -> bool:
+        """Save a new lead to DB. Returns False if it was already stored."""
+        return bool(await self._save_leads_async([lead]))
+    
+    async def _save_leads_async(self, leads: List[Lead]) -> List[Lead]:
+        """
+        Save a batch of new leads to DB in a single transaction.
+        Leads already stored (e.g. by an overlapping cycle) are skipped, not
+        errors; returns only the leads this call actually inserted.
+        """
+        if not leads:
+            return []
         
-        async with database.async_session_maker() as session:
-            session.add(new_lead)
-            await session.commit()
+        rows = [
+            {**asdict(lead), "keywords_matched": orjson.dumps(lead.keywords_matched).decode()}
+            for lead in leads
+        ]
+        
+        async with database.async_session_maker() as session, session.begin():
+            inserted_ids = None
+            if len(rows) > self.COPY_THRESHOLD:
+                # Large batches (backfills/imports) stream through COPY on PostgreSQL
+                inserted_ids = await database.copy_records(
+                    session,
+                    LeadModel.__tablename__,
+                    list(rows[0]),
+                    [tuple(row.values()) for row in rows],
+                    key_column="lead_id"
+                )
+            if inserted_ids is None:
+                # One executemany INSERT instead of unit-of-work flushing per entity
+                inserted_ids = await self._insert_new_leads(session, rows)
+        
+        inserted_ids = set(inserted_ids)
+        self._known_ids.update(inserted_ids)
+        if self._seen_bloom is not None:
+            for lead_id in inserted_ids:
+                self._seen_bloom.add(lead_id)
+        return [lead for lead in leads if lead.lead_id in inserted_ids]
+    
+    @staticmethod
+    async def _insert_new_leads(session: AsyncSession, rows: List[dict]) -> List[str]:
+        """INSERT rows, skipping lead_ids that already exist; returns the inserted IDs."""
+        dialect = (await session.connection()).dialect.name
+        if dialect == "postgresql":
+            stmt = pg_insert(LeadModel)
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(LeadModel)
+        else:
+            # No portable ON CONFLICT - a duplicate fails the batch here
+            await session.execute(insert(LeadModel), rows)
+            return [row["lead_id"] for row in rows]
+        
+        stmt = stmt.on_conflict_do_nothing(index_elements=[LeadModel.lead_id]).returning(LeadModel.lead_id)
+        result = await session.execute(stmt, rows)
+        return list(result.scalars())
     
     async def _update_lead_async(self, lead: Lead):
         """Update an existing lead in DB."""
         async with database.async_session_maker() as session:
-            stmt = select(LeadModel).where(LeadModel.lead_id == lead.lead_id)
+            # Single UPDATE by primary key - no need to load the row first
+            stmt = (
+                update(LeadModel)
+                .where(LeadModel.lead_id == lead.lead_id)
+                .values(
+                    status=lead.status,
+                    first_contact_date=lead.first_contact_date,
+                    last_contact_date=lead.last_contact_date,
+                    follow_up_count=lead.follow_up_count,
+                    notes=lead.notes
+                )
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    @staticmethod
+    def _row_to_lead(row) -> Lead:
+        """Build a Lead from a LEAD_COLUMNS row (positional, no ORM instance)."""
+        return Lead(*row[:6], orjson.loads(row[6] or "[]"), *row[7:])
+    
+    async def get_leads_needing_followup_async(self, limit: Optional[int] = None) -> List[Lead]:
+        """
+        Get contacted leads that are due a follow-up:
+        4 days after the first contact, then every 3 days.
+        Most overdue first; pass limit to take only the next few.
+        """
+        now = datetime.now()
+        first_cutoff = (now - timedelta(days=4)).isoformat()
+        later_cutoff = (now - timedelta(days=3)).isoformat()
+        
+        # ISO timestamps sort lexically, so the date filter runs on the index
+        async with database.async_session_maker() as session:
+            stmt = select(*LEAD_COLUMNS).where(
+                or_(LeadModel.status == "contacted", LeadModel.status.like("followed_up%")),
+                or_(
+                    and_(LeadModel.follow_up_count == 0, LeadModel.last_contact_date <= first_cutoff),
+                    and_(LeadModel.follow_up_count > 0, LeadModel.last_contact_date <= later_cutoff)
+                )
+            ).order_by(LeadModel.last_contact_date)
+            if limit is not None:
+                stmt = stmt.limit(limit)
             result = await session.execute(stmt)
-            lead_db = result.scalar_one_or_none()
-            
-            if lead_db:
-                lead_db.status = lead.status
-                lead_db.first_contact_date = lead.first_contact_date
-                lead_db.last_contact_date = lead.last_contact_date
-                lead_db.follow_up_count = lead.follow_up_count
-                lead_db.notes = lead.notes
-                await session.commit()
+            return [self._row_to_lead(row) for row in result.all()]
+    
+    async def export_leads_csv(self, path: str = "data/leads.csv") -> int:
+        """Export all leads to CSV (backup / legacy format). Returns rows written."""
+        async with database.async_session_maker() as session:
+            result = await session.execute(select(*LEAD_COLUMNS).order_by(LeadModel.created_at))
+            rows = result.all()
+        
+        # Write off the event loop, to a temp file swapped in atomically, so a
+        # crash mid-export never leaves a truncated backup behind
+        await asyncio.to_thread(self._write_leads_csv, path, rows)
+        return len(rows)
+    
+    @staticmethod
+    def _write_leads_csv(path: str, rows):
+        """Write lead rows to `path` via a temp file + os.replace."""
+        tmp_path = f"{path}.tmp"
+        # Columns are already in CSV order and keywords_matched is stored as JSON
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(Lead.__dataclass_fields__)
+            writer.writerows(rows)
+        os.replace(tmp_path, path)
 
     async def get_stats_async(self) -> Dict:
         """Get lead hunting statistics."""
         await self._ensure_db_ready()
         
-        async with async_session_maker() as session:
-            stmt = select(LeadModel)
+        async with database.async_session_maker() as session:
+            # One row per distinct status instead of one per lead
+            stmt = select(LeadModel.status, func.count()).group_by(LeadModel.status)
             result = await session.execute(stmt)
-            leads = result.scalars().all()
+            counts = Counter(dict(result.all()))
             
-            return {
-                "total_leads": len(leads),
-                "new": len([l for l in leads if l.status == "new"]),
-                "contacted": len([l for l in leads if l.status == "contacted"]),
-                "followed_up": len([l for l in leads if "followed_up" in l.status]),
-                "replied": len([l for l in leads if l.status == "replied"]),
-                "converted": len([l for l in leads if l.status == "converted"]),
-                "dead": len([l for l in leads if l.status == "dead"]),
-            }
+        return {
+            "total_leads": sum(counts.values()),
+            "new": counts["new"],
+            "contacted": counts["contacted"],
+            "followed_up": sum(n for status, n in counts.items() if "followed_up" in status),
+            "replied": counts["replied"],
+            "converted": counts["converted"],
+            "dead": counts["dead"],
+        }
 
     # ... keeping the core hunting logic ...
     
+    async def _with_reddit_auth(self, client: httpx.AsyncClient, headers: dict) -> dict:
+        """Add an OAuth bearer token to Reddit headers when app credentials are set."""
+        if not (self.reddit_client_id and self.reddit_client_secret):
+            return headers
+        
+        if self._reddit_token is None or time.monotonic() >= self._reddit_token_expires:
+            try:
+                response = await client.post(
+                    "https://www.reddit.com/api/v1/access_token",
+                    auth=(self.reddit_client_id, self.reddit_client_secret),
+                    data={"grant_type": "client_credentials"},
+                    headers=headers
+                )
+                response.raise_for_status()
+                token = orjson.loads(response.content)
+                self._reddit_token = token["access_token"]
+                # Refresh a minute early so no request goes out with an expired token
+                self._reddit_token_expires = time.monotonic() + token.get("expires_in", 3600) - 60
+            except Exception as e:
+                print(f"⚠️ Reddit OAuth failed, using public endpoints: {e}")
+                return headers
+        
+        return {**headers, "Authorization": f"bearer {self._reddit_token}"}
+    
+    async def _reddit_get(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        headers: dict,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        GET a Reddit listing, paced by the token bucket.
+        Honours X-Ratelimit-* headers and backs off on 429/5xx.
+        Successful responses are reused for REDDIT_CACHE_TTL seconds.
+        timeout overrides the shared client's per-request timeout.
+        """
+        cache_key = (path, tuple(sorted((params or {}).items())))
+        cached = self._reddit_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        base = "https://oauth.reddit.com" if "Authorization" in headers else "https://www.reddit.com"
+        
+        for attempt in range(self.REDDIT_MAX_RETRIES + 1):
+            await self._reddit_limiter.acquire()
+            response = await client.get(
+                f"{base}{path}",
+                params=params,
+                headers=headers,
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+            )
+            
+            reset = float(response.headers.get("X-Ratelimit-Reset") or 0)
+            remaining = response.headers.get("X-Ratelimit-Remaining")
+            if remaining is not None and float(remaining) < 1:
+                # Budget exhausted - stop every task until the window resets
+                self._reddit_limiter.defer(reset)
+            
+            if response.status_code == 200:
+                self._reddit_cache.pop(cache_key, None)
+                if len(self._reddit_cache) >= self.REDDIT_CACHE_SIZE:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    del self._reddit_cache[next(iter(self._reddit_cache))]
+                self._reddit_cache[cache_key] = (time.monotonic() + self.REDDIT_CACHE_TTL, response)
+            
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            
+            if attempt < self.REDDIT_MAX_RETRIES:
+                await asyncio.sleep(reset if response.status_code == 429 and reset else 2 ** attempt)
+        
+        return response
+    
+    async def _fetch_new_posts(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        subreddit: str,
+        headers: dict
+    ) -> List[dict]:
+        """Fetch the newest posts from one subreddit and return the raw post data."""
+        async with semaphore:
+            params = {"limit": self.POSTS_PER_SUBREDDIT}
+            response = await self._reddit_get(client, f"/r/{subreddit}/new.json", headers, params)
+        
+        if response.status_code != 200:
+            return []
+        
+        data = orjson.loads(response.content)
+        return [post.get("data", {}) for post in data.get("data", {}).get("children", [])]
+    
     async def hunt_reddit(self) -> List[Lead]:
         """Search Reddit for potential customers."""
         await self._ensure_db_ready()
         new_leads = []
+        seen_ids = set()
         
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
         
-        async with httpx.AsyncClient(timeout=30) as client:
-            # Combine static + dynamic keywords
-            all_keywords = self.HUNTING_KEYWORDS + self.DYNAMIC_TRENDS
+        # One listing per subreddit; keywords are matched locally instead of
+        # sending a search request per keyword
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        client = await self._get_http()
+        headers = await self._with_reddit_auth(client, headers)
+        results = await asyncio.gather(
+            *(self._fetch_new_posts(client, semaphore, sub, headers) for sub in self.TARGET_SUBREDDITS),
+            return_exceptions=True
+        )
+        
+        # One timestamp for every lead found in this batch
+        now_iso = datetime.now().isoformat()
+        
+        # First pass: keep posts that hit a keyword and work out their lead IDs
+        candidates = []
+        for subreddit, posts in zip(self.TARGET_SUBREDDITS, results):
+            if isinstance(posts, Exception):
+                print(f"❌ Error hunting r/{subreddit}: {posts}")
+                continue
             
-            for subreddit in self.TARGET_SUBREDDITS[:5]:
-                for keyword in all_keywords[:10]: # Limit for rate limits
-                    try:
-                        url = f"https://www.reddit.com/r/{subreddit}/search.json"
-                        params = {"q": keyword, "restrict_sr": "on", "sort": "new", "limit": 5, "t": "month"}
-                        
-                        response = await client.get(url, params=params, headers=headers)
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            posts = data.get("data", {}).get("children", [])
-                            
-                            for post in posts:
-                                post_data = post.get("data", {})
-                                username = post_data.get("author", "")
-                                
-                                if username in ["[deleted]", "AutoModerator", ""]:
-                                    continue
-                                    
-                                post_url = f"https://reddit.com{post_data.get('permalink', '')}"
-                                lead_id = self._generate_lead_id("reddit", username, post_url)
-                                
-                                if await self._is_duplicate_async(lead_id):
-                                    continue
-                                    
-                                content = f"{post_data.get('title', '')} {post_data.get('selftext', '')}"
-                                matched = [keyword]
-                                
-                                lead = Lead(
-                                    lead_id=lead_id,
-                                    platform="reddit",
-                                    username=username,
-                                    email=None,
-                                    post_content=content[:500],
-                                    post_url=post_url,
-                                    keywords_matched=matched,
-                                    status="new",
-                                    first_contact_date=None,
-                                    last_contact_date=None,
-                                    follow_up_count=0,
-                                    notes="",
-                                    created_at=datetime.now().isoformat()
-                                )
-                                new_leads.append(lead)
-                                await self._save_lead_async(lead)
-                                print(f"   ✅ Found lead: u/{username}")
-                        
-                        await asyncio.sleep(2)
-                        
-                    except Exception as e:
-                        print(f"❌ Error hunting r/{subreddit}: {e}")
-                        continue
+            for post_data in posts:
+                username = post_data.get("author", "")
+                
+                if username in self.IGNORED_AUTHORS:
+                    continue
+                
+                content = f"{post_data.get('title', '')} {post_data.get('selftext', '')}"
+                matched = self._match_keywords(content.lower())  # Lowercased once per post
+                if not matched:
+                    continue
+                    
+                post_url = f"https://reddit.com{post_data.get('permalink', '')}"
+                lead_id = self._generate_lead_id("reddit", username, post_url)
+                candidates.append((content, matched, username, post_url, lead_id))
+        
+        # One round-trip to find which candidates are already stored
+        existing = await self._find_existing_ids(list(dict.fromkeys(c[-1] for c in candidates)))
+        
+        for content, matched, username, post_url, lead_id in candidates:
+            if lead_id in seen_ids or lead_id in existing:
+                continue
+            seen_ids.add(lead_id)
+            
+            lead = Lead(
+                lead_id=lead_id,
+                platform="reddit",
+                username=username,
+                email=None,
+                post_content=content[:500],
+                post_url=post_url,
+                keywords_matched=matched,
+                status="new",
+                first_contact_date=None,
+                last_contact_date=None,
+                follow_up_count=0,
+                notes="",
+                created_at=now_iso
+            )
+            new_leads.append(lead)
+        
+        # Write the whole cycle's leads in one transaction; anything another
+        # writer stored since the duplicate check is dropped here
+        new_leads = await self._save_leads_async(new_leads)
+        for lead in new_leads:
+            print(f"   ✅ Found lead: u/{lead.username}")
         
         return new_leads
 
@@ -242,21 +666,32 @@ class LeadHunter:
         if not self.openrouter_key:
             return "Hey, I saw your post about database issues. I have a tool that might help!"
             
+        excerpt = lead.post_content[:300]
+        cache_key = hashlib.blake2b(excerpt.encode(), digest_size=16).hexdigest()
+        if cache_key in self._msg_cache:
+            self._msg_cache.move_to_end(cache_key)
+            return self._msg_cache[cache_key]
+            
         prompt = f"""You are a helpful sales rep.
-A user posted: "{lead.post_content[:300]}"
+A user posted: "{excerpt}"
 Write a SHORT, helpful Reddit comment (under 100 words).
 Offer genuine help for their database problem. Mention you have an AI tool.
 Don't use greetings or subject lines."""
 
         try:
-            async with httpx.AsyncClient() as client:
+            client = await self._get_http()
+            async with self._ai_semaphore:
                 response = await client.post(
                     "https://openrouter.ai/api/v1/chat/completions",
                     headers={"Authorization": f"Bearer {self.openrouter_key}"},
                     json={"model": "deepseek/deepseek-chat", "messages": [{"role": "user", "content": prompt}]}
                 )
-                if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"].strip()
+            if response.status_code == 200:
+                message = orjson.loads(response.content)["choices"][0]["message"]["content"].strip()
+                self._msg_cache[cache_key] = message
+                if len(self._msg_cache) > self.MSG_CACHE_SIZE:
+                    self._msg_cache.popitem(last=False)
+                return message
         except:
             pass
         return "Hey, looks like a DB issue. I built an AI tool that fixes these automatically. Let me know if you want to try it!"
@@ -268,7 +703,6 @@ Don't use greetings or subject lines."""
         subject = "Quick question about your post"
         body = message
         # Reddit compose link format: https://www.reddit.com/message/compose/?to=USERNAME&subject=SUBJECT&message=BODY
-        import urllib.parse
         encoded_subject = urllib.parse.quote(subject)
         encoded_body = urllib.parse.quote(body)
         dm_url = f"https://www.reddit.com/message/compose/?to={lead.username}&subject={encoded_subject}&message={encoded_body}"
@@ -276,24 +710,82 @@ Don't use greetings or subject lines."""
         print(f"\n📨 [ACTION REQUIRED] Click to Send DM to u/{lead.username}:")
         print(f"🔗 {dm_url}\n")
         
+        now_iso = datetime.now().isoformat()
         lead.status = "contacted"
-        lead.first_contact_date = datetime.now().isoformat()
-        lead.last_contact_date = datetime.now().isoformat()
+        lead.first_contact_date = now_iso
+        lead.last_contact_date = now_iso
         await self._update_lead_async(lead)
         
-        await self._send_telegram_alert(f"📤 **Outreach Generated**\n👤 u/{lead.username}\n🔗 [Send DM]({dm_url})")
+        await self._queue_telegram_alert(f"📤 **Outreach Generated**\n👤 u/{lead.username}\n🔗 [Send DM]({dm_url})")
         return True
 
     async def _send_telegram_alert(self, message: str):
         """Send Telegram notification."""
         if not self.telegram_token: return
         try:
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    f"https://api.telegram.org/bot{self.telegram_token}/sendMessage",
-                    json={"chat_id": self.telegram_chat_id, "text": message, "parse_mode": "Markdown"}
-                )
+            client = await self._get_http()
+            await client.post(
+                f"https://api.telegram.org/bot{self.telegram_token}/sendMessage",
+                json={"chat_id": self.telegram_chat_id, "text": message, "parse_mode": "Markdown"}
+            )
         except: pass
+    
+    async def _queue_telegram_alert(self, message: str):
+        """Queue an alert for the batching worker, or send it now if none is running."""
+        if self._tg_queue is None:
+            await self._send_telegram_alert(message)
+            return
+        self._tg_queue.put_nowait(message)
+    
+    async def _start_telegram_worker(self):
+        """Start batching Telegram alerts in the background (or join the running worker)."""
+        # No await in here, so overlapping cycles can't interleave the check and the start
+        self._tg_users += 1
+        if self._tg_worker is None:
+            self._tg_queue = asyncio.Queue()
+            self._tg_worker = asyncio.create_task(self._telegram_worker(self._tg_queue))
+    
+    async def _stop_telegram_worker(self):
+        """Leave the batching worker; the last cycle out flushes queued alerts and stops it."""
+        self._tg_users -= 1
+        if self._tg_users > 0 or self._tg_worker is None:
+            return
+        # Detach first: a cycle starting while this flush runs gets a fresh worker
+        queue, worker = self._tg_queue, self._tg_worker
+        self._tg_queue = None
+        self._tg_worker = None
+        queue.put_nowait(None)
+        await worker
+    
+    async def _telegram_worker(self, queue: asyncio.Queue):
+        """Coalesce alerts that arrive close together into a single Telegram message."""
+        carry = None
+        while True:
+            message = carry if carry is not None else await queue.get()
+            carry = None
+            if message is None:
+                return
+            
+            batch = [message]
+            size = len(message)
+            stopping = False
+            try:
+                while len(batch) < self.TELEGRAM_BATCH_SIZE:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.TELEGRAM_BATCH_WAIT)
+                    if message is None:
+                        stopping = True
+                        break
+                    if size + len(message) + 2 > self.TELEGRAM_MAX_CHARS:
+                        carry = message
+                        break
+                    batch.append(message)
+                    size += len(message) + 2
+            except asyncio.TimeoutError:
+                pass
+            
+            await self._send_telegram_alert("\n\n".join(batch))
+            if stopping:
+                return
 
     async def scan_for_trends(self):
         """
@@ -307,14 +799,23 @@ Don't use greetings or subject lines."""
         combined_titles = ""
         
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                for sub in trend_sources:
-                    url = f"https://www.reddit.com/r/{sub}/hot.json?limit=5"
-                    resp = await client.get(url, headers=headers)
-                    if resp.status_code == 200:
-                        posts = resp.json().get("data", {}).get("children", [])
-                        for p in posts:
-                            combined_titles += p["data"].get("title", "") + "\n"
+            client = await self._get_http()
+            headers = await self._with_reddit_auth(client, headers)
+            # Fetch every source at once; one failing subreddit doesn't sink the rest
+            responses = await asyncio.gather(
+                *(
+                    # Short timeout: a hung source shouldn't stall the hunting cycle
+                    self._reddit_get(client, f"/r/{sub}/hot.json", headers, {"limit": 5}, timeout=10.0)
+                    for sub in trend_sources
+                ),
+                return_exceptions=True
+            )
+            for resp in responses:
+                if isinstance(resp, Exception) or resp.status_code != 200:
+                    continue
+                posts = orjson.loads(resp.content).get("data", {}).get("children", [])
+                for p in posts:
+                    combined_titles += p["data"].get("title", "") + "\n"
         except Exception as e:
             print(f"⚠️ Trend scan failed: {e}")
             return
@@ -328,37 +829,64 @@ Don't use greetings or subject lines."""
             Separated by commas. No other text.
             """
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        "https://openrouter.ai/api/v1/chat/completions",
-                        headers={"Authorization": f"Bearer {self.openrouter_key}"},
-                        json={"model": "deepseek/deepseek-chat", "messages": [{"role": "user", "content": prompt}]}
-                    )
-                    if response.status_code == 200:
-                        content = response.json()["choices"][0]["message"]["content"]
-                        new_trends = [k.strip() for k in content.split(",") if k.strip()]
-                        
-                        # Update dynamic list
-                        self.DYNAMIC_TRENDS = new_trends[:3]
-                        print(f"🔥 TRENDS DETECTED: {self.DYNAMIC_TRENDS}")
-                        await self._send_telegram_alert(f"🏄 **Trend Alert**\nSurfing these new waves: {self.DYNAMIC_TRENDS}")
+                client = await self._get_http()
+                response = await client.post(
+                    "https://openrouter.ai/api/v1/chat/completions",
+                    headers={"Authorization": f"Bearer {self.openrouter_key}"},
+                    json={"model": "deepseek/deepseek-chat", "messages": [{"role": "user", "content": prompt}]}
+                )
+                if response.status_code == 200:
+                    content = orjson.loads(response.content)["choices"][0]["message"]["content"]
+                    new_trends = [k.strip() for k in content.split(",") if k.strip()]
+                    
+                    # Update dynamic list
+                    self.DYNAMIC_TRENDS = new_trends[:3]
+                    print(f"🔥 TRENDS DETECTED: {self.DYNAMIC_TRENDS}")
+                    await self._queue_telegram_alert(f"🏄 **Trend Alert**\nSurfing these new waves: {self.DYNAMIC_TRENDS}")
             except Exception as e:
                 print(f"⚠️ Trend analysis failed: {e}")
 
+    async def _outreach_worker(self, queue: asyncio.Queue):
+        """Generate and send outreach for queued leads, paced by the DM limiter."""
+        while True:
+            lead = await queue.get()
+            try:
+                msg = await self.generate_personalized_message(lead)
+                await self._dm_limiter.acquire()
+                await self.send_reddit_dm(lead, msg)
+            except Exception as e:
+                print(f"❌ Outreach failed for {lead.username}: {e}")
+            finally:
+                queue.task_done()
+    
     async def run_hunting_cycle(self):
         """Main hunting cycle."""
         print("🎯 Starting lead hunting cycle...")
         
-        # 1. Update Trends
-        await self.scan_for_trends()
-        
-        # 2. Hunt
-        new_leads = await self.hunt_reddit()
-        
-        for lead in new_leads:
-            msg = await self.generate_personalized_message(lead)
-            await self.send_reddit_dm(lead, msg)
-            await asyncio.sleep(60)
+        await self._start_telegram_worker()
+        try:
+            # 1. Update Trends
+            await self.scan_for_trends()
+            
+            # 2. Hunt
+            new_leads = await self.hunt_reddit()
+            
+            # 3. Outreach: workers generate messages in parallel while the
+            # shared DM limiter keeps the anti-spam cadence
+            queue: asyncio.Queue = asyncio.Queue(maxsize=32)
+            workers = [
+                asyncio.create_task(self._outreach_worker(queue))
+                for _ in range(self.OUTREACH_WORKERS)
+            ]
+            try:
+                for lead in new_leads:
+                    await queue.put(lead)
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        finally:
+            await self._stop_telegram_worker()
             
         print(f"✅ Hunting cycle complete. Found {len(new_leads)} leads.")
 
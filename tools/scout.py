@@ -4,21 +4,65 @@ Checks if incoming requests are from paid clients
 """
 
 import os
+import time
+import base64
 import secrets
 import hashlib
 import asyncio
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Iterable
 from datetime import datetime
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import asynccontextmanager, suppress
 from dataclasses import dataclass
 
-from sqlalchemy import select, update
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import select, insert, update, lambda_stmt, bindparam, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import our new DB layer
-from core.database import async_session_maker, ClientModel, init_db
+# (async_session_maker is looked up on the module: init_db may rebind it to a fallback engine)
+from core import database
+from core.database import ClientModel
 
 
-@dataclass
+# Marks AES-GCM ciphertexts; anything without it is a legacy XOR value
+_AESGCM_PREFIX = "v1:"
+_KDF_SALT = b"ai-money-printer/connection-strings"
+
+
+@lru_cache(maxsize=8)
+def _derive_key(passphrase: str) -> bytes:
+    """Derive a 256-bit AES key from ENCRYPTION_KEY (scrypt is slow - cached)."""
+    return hashlib.scrypt(passphrase.encode(), salt=_KDF_SALT, n=2**14, r=8, p=1, dklen=32)
+
+
+@lru_cache(maxsize=8192)
+def _hash_api_key(api_key: str) -> str:
+    """SHA-256 hex digest of an API key (cached - the same keys repeat constantly)."""
+    # Plain SHA-256 is deliberate: keys are 256-bit random tokens, so a slow
+    # KDF adds nothing, and a keyed HMAC would orphan every stored hash
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _xor_bytes(data: bytes, key: bytes) -> bytes:
+    """XOR data against a repeating key, as one word-wide big-int operation."""
+    repeats, extra = divmod(len(data), len(key))
+    key_stream = key * repeats + key[:extra]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key_stream, "big")).to_bytes(len(data), "big")
+
+
+@asynccontextmanager
+async def _session_scope(session: Optional[AsyncSession]) -> AsyncIterator[AsyncSession]:
+    """Use the caller's (per-request) session if given, else open a short-lived one."""
+    if session is not None:
+        yield session
+    else:
+        async with database.async_session_maker() as own_session:
+            yield own_session
+
+
+@dataclass(slots=True, frozen=True)
 class Client:
     """Represents a registered client."""
     client_id: str
@@ -35,157 +79,294 @@ class Client:
     plan: str = "per-fix"
 
 
+# Client field names / ClientModel columns, in constructor order
+CLIENT_FIELDS = tuple(Client.__dataclass_fields__)
+CLIENT_COLUMNS = [getattr(ClientModel, name) for name in CLIENT_FIELDS]
+
+
 class ClientVault:
     """
     Secure storage for client credentials and verification.
     Uses PostgreSQL for persistence.
     """
     
+    # Seconds a verified client is served from memory before re-checking the DB
+    CLIENT_CACHE_TTL = 60
+    CLIENT_CACHE_SIZE = 4096
+    
+    # Seconds last_activity stamps are buffered before one batched write
+    ACTIVITY_FLUSH_INTERVAL = 5.0
+    
     def __init__(self):
-        # Initialize DB tables on startup (non-blocking)
+        # Tables are created once by init_db() in the app's lifespan startup
         # In production, use migrations (Alembic)
-        pass
-    
-    async def _ensure_db_ready(self):
-        """Ensure tables exist (lazy init)."""
-        # This is a bit hacky for creating tables on the fly
-        # Ideally correct this in main.py startup event
-        await init_db()
+        
+        # Read once; the derived AES key is cached by _derive_key
+        self.encryption_key = os.getenv("ENCRYPTION_KEY", "default_key_change_me!")
+        
+        # api_key -> (expires_at, Client) for recently verified keys (LRU)
+        self._verified: OrderedDict[str, tuple[float, Client]] = OrderedDict()
+        # client_id -> its cached api_key, so stats updates can drop the stale entry
+        self._verified_key_by_client: dict[str, str] = {}
+        
+        # client_id -> latest activity time (epoch seconds), written in batches off the auth path
+        self._pending_activity: dict[str, float] = {}
+        self._activity_flush: Optional[asyncio.Task] = None
     
     def _hash_api_key(self, api_key: str) -> str:
         """Create a secure hash of an API key."""
-        return hashlib.sha256(api_key.encode()).hexdigest()
+        return _hash_api_key(api_key)
     
     async def register_client(
         self,
         company_name: str,
         database_type: str,
         connection_string: str,
-        plan: str = "per-fix"
+        plan: str = "per-fix",
+        session: Optional[AsyncSession] = None
     ) -> tuple[str, str]:
         """
         Register a new client and generate their credentials.
         """
-        await self._ensure_db_ready()
-        
         # Generate credentials
-        client_id = f"client_{secrets.token_hex(8)}"
-        api_key = f"amp_{secrets.token_urlsafe(32)}"
-        webhook_secret = secrets.token_urlsafe(16)
+        client_id, api_key, webhook_secret = self._new_credentials()
         
         # Encrypt connection string
-        encryption_key = os.getenv("ENCRYPTION_KEY", "default_key_change_me!")
-        encrypted_conn = self._simple_encrypt(connection_string, encryption_key)
+        encrypted_conn = self._simple_encrypt(connection_string, self.encryption_key)
+        api_key_hash = self._hash_api_key(api_key)
         
         new_client = ClientModel(
             client_id=client_id,
             company_name=company_name,
-            api_key_hash=self._hash_api_key(api_key),
+            api_key_hash=api_key_hash,
             webhook_secret=webhook_secret,
             database_type=database_type,
             connection_string_encrypted=encrypted_conn,
             is_active=True,
-            plan=plan,
-            created_at=datetime.now().isoformat()
+            plan=plan
+            # created_at is filled in by the column default at INSERT time
         )
         
-        async with async_session_maker() as session:
+        async with _session_scope(session) as session:
             session.add(new_client)
             await session.commit()
-            
+        
+        # New clients usually call straight back in - serve that from memory
+        self._cache_verified(api_key, self._model_to_dataclass(new_client))
+        
         return client_id, api_key
     
-    def verify_client(self, api_key: str) -> Optional[Client]:
+    async def register_clients_bulk(
+        self,
+        rows: Iterable[dict],
+        session: Optional[AsyncSession] = None
+    ) -> list[tuple[str, str]]:
         """
-        Verify an API key and return the client if valid.
-        NOTE: This method is synchronous in the interface, but we need to run async DB calls.
-        We'll use a helper to run the async verify.
+        Register many clients in one INSERT and one commit (e.g. a CSV import).
+        Each row needs company_name, database_type and connection_string; plan is optional.
+        Returns (client_id, api_key) pairs in input order.
         """
-        # This wrapper allows calling async code from sync context if needed,
-        # but optimally we should update main.py to await this.
-        # For now, let's assume the caller can await if we change the signature.
-        # But to avoid breaking main.py immediately, we'll try to run it.
-        # UPDATE: We should update main.py to async.
-        # But wait - main.py endpoints ARE async. We can change this to async!
-        raise NotImplementedError("Use verify_client_async instead")
-
-    async def verify_client_async(self, api_key: str) -> Optional[Client]:
+        credentials = []
+        values = []
+        for row in rows:
+            client_id, api_key, webhook_secret = self._new_credentials()
+            credentials.append((client_id, api_key))
+            values.append({
+                "client_id": client_id,
+                "company_name": row["company_name"],
+                "api_key_hash": self._hash_api_key(api_key),
+                "webhook_secret": webhook_secret,
+                "database_type": row["database_type"],
+                "connection_string_encrypted": self._simple_encrypt(row["connection_string"], self.encryption_key),
+                "is_active": True,
+                "plan": row.get("plan", "per-fix"),
+            })
+        
+        if not values:
+            return []
+        
+        async with _session_scope(session) as session:
+            # executemany - batched into multi-row INSERTs by the driver, one commit
+            await session.execute(insert(ClientModel), values)
+            await session.commit()
+        
+        return credentials
+    
+    @staticmethod
+    def _new_credentials() -> tuple[str, str, str]:
+        """Generate a fresh (client_id, api_key, webhook_secret)."""
+        client_id = f"client_{secrets.token_hex(8)}"
+        api_key = f"amp_{secrets.token_urlsafe(32)}"
+        webhook_secret = secrets.token_urlsafe(16)
+        return client_id, api_key, webhook_secret
+    
+    async def verify_client_async(self, api_key: str, session: Optional[AsyncSession] = None) -> Optional[Client]:
         """Async version of client verification."""
+        # Recently verified keys skip hashing and the DB round-trip
+        cached = self._verified.get(api_key)
+        if cached and cached[0] > time.monotonic():
+            self._verified.move_to_end(api_key)
+            self._record_activity(cached[1].client_id)
+            return cached[1]
+        
         hashed_key = self._hash_api_key(api_key)
         
-        async with async_session_maker() as session:
-            stmt = select(ClientModel).where(ClientModel.api_key_hash == hashed_key)
+        async with _session_scope(session) as session:
+            # lambda_stmt caches the built statement; hashed_key is bound per call
+            # (deactivated clients are filtered in SQL, so their rows never come back)
+            stmt = lambda_stmt(
+                lambda: select(ClientModel).where(
+                    ClientModel.api_key_hash == hashed_key,
+                    ClientModel.is_active.is_(True)
+                )
+            )
             result = await session.execute(stmt)
             client_model = result.scalar_one_or_none()
             
-            if not client_model or not client_model.is_active:
+            if not client_model:
+                self._drop_verified(api_key)
                 return None
             
-            # Update activity
-            client_model.last_activity = datetime.now().isoformat()
-            await session.commit()
-            
-            return self._model_to_dataclass(client_model)
+            client = self._model_to_dataclass(client_model)
+        
+        # Auth stays read-only; the activity stamp is flushed in a batch later
+        self._record_activity(client.client_id)
+        self._cache_verified(api_key, client)
+        return client
     
-    async def update_client_stats(self, client_id: str, amount_billed: float):
-        """Update client statistics."""
-        async with async_session_maker() as session:
-            stmt = select(ClientModel).where(ClientModel.client_id == client_id)
-            result = await session.execute(stmt)
-            client = result.scalar_one_or_none()
-            
-            if client:
-                client.total_fixes += 1
-                client.total_billed += amount_billed
-                client.last_activity = datetime.now().isoformat()
+    def _cache_verified(self, api_key: str, client: Client):
+        """Remember a verified client, evicting the least recently used key when full."""
+        self._verified[api_key] = (time.monotonic() + self.CLIENT_CACHE_TTL, client)
+        self._verified.move_to_end(api_key)
+        self._verified_key_by_client[client.client_id] = api_key
+        if len(self._verified) > self.CLIENT_CACHE_SIZE:
+            self._drop_verified(next(iter(self._verified)))
+    
+    def _drop_verified(self, api_key: str):
+        """Forget a cached verification (and its client_id mapping)."""
+        entry = self._verified.pop(api_key, None)
+        if entry and self._verified_key_by_client.get(entry[1].client_id) == api_key:
+            del self._verified_key_by_client[entry[1].client_id]
+    
+    def _record_activity(self, client_id: str):
+        """Buffer a last_activity stamp and make sure a flush is scheduled."""
+        # A bare float here; ISO formatting happens once per flush, not per request
+        self._pending_activity[client_id] = time.time()
+        if self._activity_flush is None or self._activity_flush.done():
+            self._activity_flush = asyncio.create_task(self._flush_activity_later())
+    
+    async def _flush_activity_later(self):
+        """Flush buffered activity after ACTIVITY_FLUSH_INTERVAL seconds."""
+        await asyncio.sleep(self.ACTIVITY_FLUSH_INTERVAL)
+        try:
+            await self.flush_activity()
+        except Exception as e:
+            print(f"⚠️ Failed to flush client activity: {e}")
+    
+    async def flush_activity(self):
+        """Write every buffered last_activity stamp in one bulk UPDATE."""
+        if not self._pending_activity:
+            return
+        
+        pending, self._pending_activity = self._pending_activity, {}
+        table = ClientModel.__table__
+        # Buffered stamps are older than anything update_client_stats wrote
+        # meanwhile - only move last_activity forwards (ISO strings sort by time)
+        stmt = (
+            update(table)
+            .where(
+                table.c.client_id == bindparam("cid"),
+                or_(table.c.last_activity.is_(None), table.c.last_activity < bindparam("ts"))
+            )
+            .values(last_activity=bindparam("ts"))
+        )
+        try:
+            async with database.async_session_maker() as session:
+                # One executemany round-trip for the whole batch
+                await session.execute(
+                    stmt,
+                    [{"cid": cid, "ts": datetime.fromtimestamp(ts).isoformat()} for cid, ts in pending.items()]
+                )
                 await session.commit()
+        except BaseException:
+            # Keep the stamps for the next flush unless newer ones arrived meanwhile
+            # (BaseException: a flush cancelled mid-write must not drop them either)
+            for cid, ts in pending.items():
+                self._pending_activity.setdefault(cid, ts)
+            raise
+    
+    async def close(self):
+        """Stop the pending flush timer and write any buffered activity now."""
+        if self._activity_flush is not None:
+            self._activity_flush.cancel()
+            # Let a cancelled in-flight write put its stamps back before the final flush
+            with suppress(asyncio.CancelledError):
+                await self._activity_flush
+            self._activity_flush = None
+        await self.flush_activity()
+    
+    async def update_client_stats(
+        self,
+        client_id: str,
+        amount_billed: float,
+        session: Optional[AsyncSession] = None
+    ):
+        """Update client statistics."""
+        async with _session_scope(session) as session:
+            # Increment in SQL: one round-trip, and concurrent fixes can't lose updates
+            now_iso = datetime.now().isoformat()
+            stmt = lambda_stmt(
+                lambda: update(ClientModel)
+                .where(ClientModel.client_id == client_id)
+                .values(
+                    total_fixes=ClientModel.total_fixes + 1,
+                    total_billed=ClientModel.total_billed + amount_billed,
+                    last_activity=now_iso
+                )
+            )
+            await session.execute(stmt)
+            await session.commit()
+        
+        # The cached Client still carries the old totals - re-read it on the next verify
+        api_key = self._verified_key_by_client.get(client_id)
+        if api_key is not None:
+            self._drop_verified(api_key)
 
-    async def list_active_clients_async(self) -> List[Client]:
+    async def list_active_clients_async(self, session: Optional[AsyncSession] = None) -> List[Client]:
         """List all active clients."""
-        async with async_session_maker() as session:
-            stmt = select(ClientModel).where(ClientModel.is_active == True)
-            result = await session.execute(stmt)
-            clients = result.scalars().all()
-            return [self._model_to_dataclass(c) for c in clients]
+        return [client async for client in self.iter_active_clients(session)]
+    
+    async def iter_active_clients(self, session: Optional[AsyncSession] = None) -> AsyncIterator[Client]:
+        """Stream active clients in batches instead of loading every row at once."""
+        async with _session_scope(session) as session:
+            # Plain column rows map straight onto Client - no ORM identity/state tracking
+            stmt = select(*CLIENT_COLUMNS).where(ClientModel.is_active.is_(True))
+            result = await session.stream(stmt.execution_options(yield_per=500))
+            async for row in result:
+                yield Client(*row)
             
     async def get_decrypted_connection(self, client: Client) -> str:
         """Decrypt connection string."""
-        encryption_key = os.getenv("ENCRYPTION_KEY", "default_key_change_me!")
-        return self._simple_decrypt(client.connection_string_encrypted, encryption_key)
+        return self._simple_decrypt(client.connection_string_encrypted, self.encryption_key)
         
     def _model_to_dataclass(self, model: ClientModel) -> Client:
         """Convert DB model to dataclass."""
-        return Client(
-            client_id=model.client_id,
-            company_name=model.company_name,
-            api_key_hash=model.api_key_hash,
-            webhook_secret=model.webhook_secret,
-            database_type=model.database_type,
-            connection_string_encrypted=model.connection_string_encrypted,
-            is_active=model.is_active,
-            created_at=model.created_at,
-            last_activity=model.last_activity,
-            total_fixes=model.total_fixes,
-            total_billed=model.total_billed,
-            plan=model.plan
-        )
+        return Client(*[getattr(model, name) for name in CLIENT_FIELDS])
     
     @staticmethod
     def _simple_encrypt(data: str, key: str) -> str:
-        """Simple XOR encryption."""
-        import base64
-        key_bytes = key.encode() * (len(data) // len(key) + 1)
-        encrypted = bytes([a ^ b for a, b in zip(data.encode(), key_bytes[:len(data)])])
-        return base64.b64encode(encrypted).decode()
+        """AES-256-GCM encryption (random nonce stored in front of the ciphertext)."""
+        nonce = os.urandom(12)
+        encrypted = AESGCM(_derive_key(key)).encrypt(nonce, data.encode(), None)
+        return _AESGCM_PREFIX + base64.b64encode(nonce + encrypted).decode()
     
     @staticmethod
     def _simple_decrypt(data: str, key: str) -> str:
-        """Simple XOR decryption."""
-        import base64
-        encrypted = base64.b64decode(data.encode())
-        key_bytes = key.encode() * (len(encrypted) // len(key) + 1)
-        decrypted = bytes([a ^ b for a, b in zip(encrypted, key_bytes[:len(encrypted)])])
-        return decrypted.decode()
+        """Decrypt AES-GCM values, falling back to XOR for rows stored before it."""
+        if data.startswith(_AESGCM_PREFIX):
+            raw = base64.b64decode(data[len(_AESGCM_PREFIX):])
+            return AESGCM(_derive_key(key)).decrypt(raw[:12], raw[12:], None).decode()
+        return _xor_bytes(base64.b64decode(data.encode()), key.encode()).decode()
 
 
 # Singleton instance
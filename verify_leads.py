@@ -0,0 +1,104 @@
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import delete, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from core import database
+from core.database import Base, LeadModel
+from tools.lead_hunter import LeadHunter, Lead
+
+# The COPY path only exists on PostgreSQL (asyncpg). Point this at a scratch
+# database - the leads table is emptied before each check.
+PG_URL = os.getenv("TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(
+    not PG_URL.startswith("postgresql+asyncpg://"),
+    reason="TEST_DATABASE_URL (postgresql+asyncpg://...) not set"
+)
+
+
+def make_lead(i: int) -> Lead:
+    return Lead(
+        lead_id=f"copy_{i}",
+        platform="reddit",
+        username=f"user_{i}",
+        email=None,
+        post_content="Postgres keeps deadlocking",
+        post_url=f"https://reddit.com/r/PostgreSQL/{i}",
+        keywords_matched=["deadlock"],
+        status="new",
+        first_contact_date=None,
+        last_contact_date=None,
+        follow_up_count=0,
+        notes="",
+        created_at="2026-01-01T00:00:00"
+    )
+
+
+async def save_batches(*batches: list[Lead]) -> tuple[list[list[str]], int, int]:
+    """Save each batch with a fresh hunter; return saved IDs, COPY calls and stored rows."""
+    engine = create_async_engine(PG_URL)
+    database.async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(LeadModel))
+
+    copy_calls = 0
+    real_copy = database.copy_records
+
+    async def counting_copy(*args, **kwargs):
+        nonlocal copy_calls
+        result = await real_copy(*args, **kwargs)
+        copy_calls += result is not None
+        return result
+
+    database.copy_records = counting_copy
+    try:
+        saved = []
+        for batch in batches:
+            saved.append([lead.lead_id for lead in await LeadHunter()._save_leads_async(batch)])
+
+        async with database.async_session_maker() as session:
+            stored = (await session.execute(select(func.count()).select_from(LeadModel))).scalar()
+    finally:
+        database.copy_records = real_copy
+        await engine.dispose()
+
+    return saved, copy_calls, stored
+
+
+def test_copy_path_saves_large_batch():
+    print("\n1. Saving a batch larger than COPY_THRESHOLD...")
+    size = LeadHunter.COPY_THRESHOLD + 50
+    (saved,), copy_calls, stored = asyncio.run(save_batches([make_lead(i) for i in range(size)]))
+
+    print(f"   Saved {len(saved)} leads via {copy_calls} COPY call(s)")
+    assert copy_calls == 1
+    assert len(saved) == size
+    assert stored == size
+
+
+def test_copy_path_skips_stored_leads():
+    print("\n2. Saving an overlapping batch through COPY...")
+    size = LeadHunter.COPY_THRESHOLD + 50
+    first = [make_lead(i) for i in range(size)]
+    overlapping = [make_lead(i) for i in range(size - 20, 2 * size)]
+    (saved_first, saved_second), copy_calls, stored = asyncio.run(save_batches(first, overlapping))
+
+    print(f"   Second batch inserted {len(saved_second)} of {len(overlapping)}")
+    assert copy_calls == 2
+    assert saved_second == [lead.lead_id for lead in overlapping[20:]]
+    assert stored == 2 * size
+
+
+if __name__ == "__main__":
+    print("🧪 Verifying bulk lead saves (COPY path)...")
+    if not PG_URL.startswith("postgresql+asyncpg://"):
+        print("⚠️ Set TEST_DATABASE_URL=postgresql+asyncpg://... to run these checks")
+    else:
+        test_copy_path_saves_large_batch()
+        test_copy_path_skips_stored_leads()
@@ -1,79 +1,173 @@
 
 import asyncio
 import os
-from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+from types import SimpleNamespace
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-# IMPORT MAIN MODULE to patch it
 import main 
+from core import database
+from core.database import Base
+from tools.scout import ClientVault
 
-# MOCK EVERYTHING
-mock_vault = MagicMock()
-mock_vault._ensure_db_ready = AsyncMock(return_value=None)
-mock_vault.register_client = AsyncMock(return_value=("client_123", "key_abc"))
-mock_vault.list_active_clients_async = AsyncMock(return_value=[])
-
-mock_billing = MagicMock()
-mock_billing.create_now_invoice = AsyncMock(return_value="https://nowpayments.io/payment/?iid=mock_123")
-mock_billing.log_success = AsyncMock()
-mock_billing.telegram_token = "mock"
-mock_billing.telegram_chat_id = "mock"
-
-# Monkeypatch MAIN module directly
-main.get_vault = lambda: mock_vault
-main.get_billing = lambda: mock_billing
-main.get_brain = lambda: MagicMock() # Mock brain too if needed
-main.get_fixer = lambda: MagicMock()
-main.get_safety = lambda: MagicMock()
-
-# Also override dependency injection for endpoints
-main.app.dependency_overrides[main.get_vault] = lambda: mock_vault
-main.app.dependency_overrides[main.get_billing] = lambda: mock_billing
-
-def test_checkout_flow():
-    print("🧪 Verifying Revenue Optimization Flow (Mocked DB)...")
+
+class FakeVault:
+    """Just enough of ClientVault for the checkout endpoints."""
     
-    # We use TestClient which triggers lifespan
-    # Our mocks should prevent DB connection attempts
+    async def register_client(self, company_name, database_type, connection_string, plan="per-fix", session=None):
+        return "client_123", "key_abc"
     
-    with TestClient(main.app) as client:
-        # 1. Test /buy-access
-        print("\n1. Testing /buy-access endpoint...")
-        payload = {
-            "company_name": "Test Corp",
-            "email": "cio@testcorp.com",
-            "plan": "per-fix"
-        }
-        
-        response = client.post("/buy-access", json=payload)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print("   ✅ Success! Endpoint returned 200")
-            print(f"   Payment URL: {data['payment_url']}")
-            print(f"   Order ID: {data['order_id']}")
-            print(f"   Temp API Key: {data['temp_api_key']}")
-            
-            assert data["client_id"] == "client_123"
-            assert data["temp_api_key"] == "key_abc"
-        else:
-            print(f"   ❌ Failed: {response.status_code} - {response.text}")
-
-        # 2. Test Partial Payment Webhook
-        print("\n2. Testing /webhook/nowpayments (Finished)...")
-        webhook_payload = {
-            "payment_status": "finished",
-            "order_id": "access_test_123",
-            "pay_amount": 50,
-            "pay_currency": "usdt",
-            "actually_paid": 50
-        }
+    async def list_active_clients_async(self):
+        return []
+    
+    async def close(self):
+        pass
+
+
+class FakeBilling:
+    """Just enough of BillingSystem for the checkout endpoints."""
+    telegram_token = "mock"
+    telegram_chat_id = "mock"
+    
+    async def create_now_invoice(self, amount, fix_id, description=None):
+        return "https://nowpayments.io/payment/?iid=mock_123"
+    
+    async def log_success(self, *args, custom_amount=None, **kwargs):
+        return SimpleNamespace(amount_usd=custom_amount or 0.0)
+
+
+class FakeBrain:
+    """Always resolves the ticket."""
+    
+    async def process_request(self, agent_type, input_data, context=None):
+        return {"response_to_customer": "Your refund is on its way."}
+    
+    def check_outcome_success(self, response, agent_type):
+        return True
+
+
+class FakeContentSafety:
+    """Passes every response."""
+    
+    def check_content(self, **kwargs):
+        return None
+    
+    def get_content_green_light(self, result):
+        return True
+
+
+fake_vault = FakeVault()
+fake_billing = FakeBilling()
+
+# Endpoints get their vault/billing through dependency injection
+main.app.dependency_overrides[main.get_vault] = lambda: fake_vault
+main.app.dependency_overrides[main.get_billing] = lambda: fake_billing
+main.app.dependency_overrides[main.get_db] = lambda: None
+
+# The lifespan hook calls get_vault() and init_db() directly - keep it off the DB
+main.get_vault = lambda: fake_vault
+
+
+async def _skip_init_db():
+    pass
+
+
+main.init_db = _skip_init_db
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient (and one lifespan startup/shutdown) for every check."""
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_buy_access(client):
+    # 1. Test /buy-access
+    print("\n1. Testing /buy-access endpoint...")
+    payload = {
+        "company_name": "Test Corp",
+        "email": "cio@testcorp.com",
+        "plan": "per-fix"
+    }
+    
+    response = client.post("/buy-access", json=payload)
+    
+    if response.status_code == 200:
+        data = response.json()
+        print("   ✅ Success! Endpoint returned 200")
+        print(f"   Payment URL: {data['payment_url']}")
+        print(f"   Order ID: {data['order_id']}")
+        print(f"   Temp API Key: {data['temp_api_key']}")
         
-        resp = client.post("/webhook/nowpayments", json=webhook_payload)
-        if resp.status_code == 200:
-             print("   ✅ Webhook processed successfully")
-        else:
-             print(f"   ❌ Webhook failed: {resp.status_code}")
+        assert data["client_id"] == "client_123"
+        assert data["temp_api_key"] == "key_abc"
+    else:
+        print(f"   ❌ Failed: {response.status_code} - {response.text}")
+    assert response.status_code == 200
+
+
+def test_nowpayments_webhook(client):
+    # 2. Test Payment Webhook
+    print("\n2. Testing /webhook/nowpayments (Finished)...")
+    webhook_payload = {
+        "payment_status": "finished",
+        "order_id": "access_test_123",
+        "pay_amount": 50,
+        "pay_currency": "usdt",
+        "actually_paid": 50
+    }
+    
+    resp = client.post("/webhook/nowpayments", json=webhook_payload)
+    if resp.status_code == 200:
+         print("   ✅ Webhook processed successfully")
+    else:
+         print(f"   ❌ Webhook failed: {resp.status_code}")
+    assert resp.status_code == 200
+
+
+def test_billed_outcome_refreshes_cached_client(client, monkeypatch, tmp_path):
+    # 3. Billing an outcome must not leave stale totals in the verification cache
+    print("\n3. Testing /webhook/support billing -> client stats...")
+    pytest.importorskip("aiosqlite")
+    
+    # A real vault on a throwaway SQLite database
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'clients.db'}")
+    monkeypatch.setattr(database, "async_session_maker", async_sessionmaker(engine, expire_on_commit=False))
+    
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    
+    vault = ClientVault()
+    monkeypatch.setattr(main, "get_vault", lambda: vault)
+    monkeypatch.setattr(main, "get_brain", lambda: FakeBrain())
+    monkeypatch.setattr(main, "get_content_safety", lambda: FakeContentSafety())
+    
+    client.portal.call(create_tables)
+    client_id, api_key = client.portal.call(vault.register_client, "Ticket Corp", "sqlite", "data/test.db")
+    before = client.portal.call(vault.verify_client_async, api_key)
+    assert before.total_fixes == 0
+    
+    ticket = {"customer_name": "Ana", "issue": "Where is my refund?"}
+    resp = client.post("/webhook/support", json=ticket, headers={"x-api-key": api_key})
+    assert resp.status_code == 200
+    
+    # The background task has billed the ticket by now; the next verify must see it
+    after = client.portal.call(vault.verify_client_async, api_key)
+    print(f"   total_fixes {before.total_fixes} -> {after.total_fixes}, billed ${after.total_billed:.2f}")
+    assert after.client_id == client_id
+    assert after.total_fixes == 1
+    assert after.total_billed > 0
+    
+    client.portal.call(vault.close)
+    client.portal.call(engine.dispose)
+
 
 if __name__ == "__main__":
-    test_checkout_flow()
+    print("🧪 Verifying Revenue Optimization Flow (Mocked DB)...")
+    # Start the app once and run every check against it
+    with TestClient(main.app) as client:
+        test_buy_access(client)
+        test_nowpayments_webhook(client)